@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+
+import numpy as np
+
+from generate_dataset import (
+    output_dir, plan_path, results_path,
+    write_job_plan, create_result_array, job_from_plan, export_results,
+    write_workflow, simulator_command, collect_results, store_result,
+)
+
+# ==========================================
+# 1. SETTINGS
+# ==========================================
+# One Python process drives every simulation: the containers run as
+# asyncio subprocesses, so the only limit is how many Docker runs the
+# machine can hold at once (RAM), not how many Python workers we start.
+max_in_flight = 15          # concurrent `docker run` processes
+progress_host = "127.0.0.1"
+progress_port = 8765        # GET http://127.0.0.1:8765/ -> JSON progress
+progress_timeout = 5.0      # seconds a client may take to send its request
+
+# ==========================================
+# 2. PROGRESS TRACKING
+# ==========================================
+class SweepProgress:
+    """Counters shared by the job coroutines and the progress endpoint"""
+
+    def __init__(self, total):
+        self.total = total
+        self.started = 0
+        self.running = 0
+        self.extracting = 0
+        self.finished = 0
+        self.failed = 0
+        self.start_time = time.time()
+
+    def snapshot(self):
+        elapsed = time.time() - self.start_time
+        rate = self.finished / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.finished
+        return {
+            "total": self.total,
+            "finished": self.finished,
+            "failed": self.failed,
+            "running": self.running,
+            "extracting": self.extracting,
+            "queued": self.total - self.started,
+            "elapsed_s": round(elapsed, 1),
+            "jobs_per_s": round(rate, 4),
+            "eta_s": round(remaining / rate, 1) if rate > 0 else None,
+        }
+
+async def serve_progress(progress):
+    """Minimal HTTP endpoint: every request gets the current snapshot as JSON"""
+    async def handle(reader, writer):
+        try:
+            # Drain the request head (the path is ignored). The timeout stops an
+            # idle client from holding the connection open, which would keep
+            # server.wait_closed() and therefore run_sweep() from returning.
+            while (await asyncio.wait_for(reader.readline(), progress_timeout)) not in (b"\r\n", b"\n", b""):
+                pass
+            body = json.dumps(progress.snapshot()).encode()
+            writer.write(
+                b"HTTP/1.0 200 OK\r\n"
+                b"Content-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, progress_host, progress_port)
+
+# ==========================================
+# 3. JOB COROUTINE
+# ==========================================
+async def simulate(job, slots, progress):
+    """Runs one simulation; releases its slot as soon as the container exits"""
+    try:
+        run_folder = write_workflow(job)
+        progress.running += 1
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *simulator_command(job['run_id']),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            await proc.wait()
+        except OSError:
+            pass  # Docker missing/unstartable: collect_results() reports it as invalid
+        finally:
+            progress.running -= 1
+    finally:
+        slots.release()
+
+    # SQL parsing happens on a thread, overlapping the simulations that
+    # have already taken this job's slot.
+    progress.extracting += 1
+    try:
+        return await asyncio.to_thread(collect_results, job, run_folder)
+    finally:
+        progress.extracting -= 1
+
+async def run_job(i, plan, results, slots, progress):
+    """Runs one plan row; any error marks the row failed instead of escaping the task"""
+    job = job_from_plan(plan, i)
+    try:
+        res = await simulate(job, slots, progress)
+        store_result(results, i, res)
+        status = f"{res['eui_total_MJ_m2']} MJ/m2" if res["valid_sim"] else "FAIL"
+    except Exception as e:
+        status = f"FAIL ({type(e).__name__}: {e})"
+
+    progress.finished += 1
+    if status.startswith("FAIL"):
+        progress.failed += 1
+    print(f"[{progress.finished}/{progress.total}] {job['run_id']} | {job['weather'][:8]}.. | {status}")
+
+async def run_sweep(plan, results):
+    progress = SweepProgress(len(plan))
+    server = await serve_progress(progress)
+    print(f"Progress: http://{progress_host}:{progress_port}/")
+
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+    errors = []  # anything run_job() itself could not absorb (e.g. a broken stdout)
+
+    def finished(task):
+        tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            errors.append(task.exception())
+
+    try:
+        # Tasks are created only once a slot is free, so a million-row plan
+        # never turns into a million pending coroutines.
+        for i in range(len(plan)):
+            await slots.acquire()
+            progress.started += 1
+            task = asyncio.create_task(run_job(i, plan, results, slots, progress))
+            tasks.add(task)
+            task.add_done_callback(finished)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if errors:
+            raise errors[0]
+    finally:
+        server.close()
+        await server.wait_closed()
+    return progress
+
+# ==========================================
+# 4. EXECUTION
+# ==========================================
+if __name__ == "__main__":
+    if os.path.exists(output_dir): shutil.rmtree(output_dir)
+    os.makedirs(output_dir)
+
+    # 1. PLAN
+    n_jobs = write_job_plan(plan_path)
+    plan = np.load(plan_path, mmap_mode="r")
+    results = create_result_array(results_path, n_jobs)
+    print(f"Generated Grid: {n_jobs} simulations ({max_in_flight} in flight).")
+    print("="*60)
+
+    # 2. RUN
+    start_time = time.time()
+    asyncio.run(run_sweep(plan, results))
+
+    # 3. EXPORT
+    export_results(plan, results, n_jobs, start_time)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `openstudio run -w workflow.osw` used by the benchmarks.
+
+Instead of simulating, it writes run/eplusout.sql next to the workflow with
+an EnergyPlus-style TabularData / Strings / TabularDataWithStrings schema.
+The rows come from every table in seeds/1/run/eplustbl.htm. Building area
+and energy values are rescaled from the workflow arguments, so the same
+workflow always gives the same output.
+"""
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import tempfile
+from html.parser import HTMLParser
+
+# ==========================================
+# 1. PATHS
+# ==========================================
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+source_html = os.path.join(project_root, "seeds", "1", "run", "eplustbl.htm")
+
+# The parsed tables are cached as a template database; every fake run copies it.
+template_path = os.environ.get(
+    "FAKE_OPENSTUDIO_TEMPLATE",
+    os.path.join(tempfile.gettempdir(), "fake_openstudio_eplusout.sql")
+)
+
+# ==========================================
+# 2. PARSE eplustbl.htm
+# ==========================================
+class TabularHTMLParser(HTMLParser):
+    """Collects (ReportName, ReportForString, TableName, RowName, ColumnName, Units, Value) rows"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.report = ""        # e.g. AnnualBuildingUtilityPerformanceSummary
+        self.report_for = ""    # e.g. Entire Facility
+        self.table_name = ""
+        self.table = None       # list of rows (list of cell strings) while inside <table>
+        self.cell = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and "::" in (attrs.get("name") or ""):
+            self.report, _ = attrs["name"].split("::", 1)
+        elif tag == "table":
+            self.table = []
+        elif tag == "tr" and self.table is not None:
+            self.table.append([])
+        elif tag == "td" and self.table is not None:
+            self.cell = ""
+
+    def handle_endtag(self, tag):
+        if tag == "td" and self.cell is not None:
+            self.table[-1].append(" ".join(self.cell.split()))
+            self.cell = None
+        elif tag == "table" and self.table is not None:
+            self._flush_table()
+            self.table = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell += data
+
+    def handle_comment(self, data):
+        # <!-- FullName:Report Long Name_For String_Table Name-->
+        data = data.strip()
+        if data.startswith("FullName:"):
+            parts = data[len("FullName:"):].split("_")
+            if len(parts) >= 3:
+                self.report_for = parts[1]
+                self.table_name = "_".join(parts[2:])
+
+    def _flush_table(self):
+        if not self.table_name or len(self.table) < 2:
+            return
+        header = self.table[0][1:]
+        columns = []
+        for h in header:
+            if h.endswith("]") and " [" in h:
+                name, units = h[:-1].rsplit(" [", 1)
+            else:
+                name, units = h, ""
+            columns.append((name, units))
+        for row in self.table[1:]:
+            if not row:
+                continue
+            row_name, values = row[0], row[1:]
+            for (col, units), value in zip(columns, values):
+                self.rows.append((self.report, self.report_for, self.table_name, row_name, col, units, value))
+        self.table_name = ""
+
+def parse_tabular_html(path=source_html):
+    parser = TabularHTMLParser()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        parser.feed(f.read())
+    return parser.rows
+
+# ==========================================
+# 3. BUILD THE TEMPLATE DATABASE
+# ==========================================
+SCHEMA = """
+CREATE TABLE StringTypes (StringTypeIndex INTEGER PRIMARY KEY, Value TEXT);
+CREATE TABLE Strings (StringIndex INTEGER PRIMARY KEY, StringTypeIndex INTEGER, Value TEXT,
+    UNIQUE(StringTypeIndex, Value));
+CREATE TABLE TabularData (TabularDataIndex INTEGER PRIMARY KEY,
+    ReportNameIndex INTEGER, ReportForStringIndex INTEGER, TableNameIndex INTEGER,
+    RowNameIndex INTEGER, ColumnNameIndex INTEGER, UnitsIndex INTEGER,
+    SimulationIndex INTEGER, RowId INTEGER, ColumnId INTEGER, Value TEXT);
+CREATE VIEW TabularDataWithStrings AS SELECT
+    td.TabularDataIndex, td.Value AS Value, reportn.Value AS ReportName,
+    fs.Value AS ReportForString, tn.Value AS TableName, rn.Value AS RowName,
+    cn.Value AS ColumnName, u.Value AS Units
+    FROM TabularData AS td
+    INNER JOIN Strings AS reportn ON reportn.StringIndex = td.ReportNameIndex
+    INNER JOIN Strings AS fs ON fs.StringIndex = td.ReportForStringIndex
+    INNER JOIN Strings AS tn ON tn.StringIndex = td.TableNameIndex
+    INNER JOIN Strings AS rn ON rn.StringIndex = td.RowNameIndex
+    INNER JOIN Strings AS cn ON cn.StringIndex = td.ColumnNameIndex
+    INNER JOIN Strings AS u ON u.StringIndex = td.UnitsIndex;
+"""
+
+STRING_TYPES = ["ReportName", "ReportForString", "TableName", "RowName", "ColumnName", "Units"]
+
+def build_template(path=template_path, html_path=source_html):
+    rows = parse_tabular_html(html_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path): os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO StringTypes VALUES (?, ?)", enumerate(STRING_TYPES, 1))
+
+    string_ids = {}
+    def string_id(type_index, value):
+        key = (type_index, value)
+        if key not in string_ids:
+            string_ids[key] = len(string_ids) + 1
+            conn.execute("INSERT INTO Strings VALUES (?, ?, ?)", (string_ids[key], type_index, value))
+        return string_ids[key]
+
+    data = []
+    for n, row in enumerate(rows, 1):
+        ids = [string_id(t, v) for t, v in enumerate(row[:6], 1)]
+        data.append((n, *ids, 1, 0, 0, row[6]))
+    conn.executemany("INSERT INTO TabularData VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", data)
+    conn.commit()
+    conn.close()
+
+    os.replace(tmp_path, path)  # atomic, so concurrent fake runs never see a half-built file
+    return path
+
+# ==========================================
+# 4. FAKE RUN
+# ==========================================
+def workflow_factors(osw):
+    """Deterministic area / energy multipliers from the measure arguments"""
+    args = {}
+    for step in osw.get("steps", []):
+        for k, v in step.get("arguments", {}).items():
+            args[f"{step['measure_dir_name']}.{k}"] = v
+
+    area = float(args.get("SetBuildingScale.x_scale", 1.0)) * float(args.get("SetBuildingScale.y_scale", 1.0))
+    height = float(args.get("SetBuildingScale.z_scale", 1.0))
+    wwr = float(args.get("SetWindowToWallRatio.wwr", 0.3))
+    # IP R-values, as the measures receive them
+    wall = float(args.get("SetWallInsulation.r_value", 13.0))
+    roof = float(args.get("SetRoofInsulation.r_value", 30.0))
+    floor = float(args.get("SetFloorInsulation.r_value", 30.0))
+    infil = float(args.get("SetInfiltrationWeatherDriven.flow_per_area", 0.0006))
+
+    intensity = 0.85 + 0.25 * wwr + 1.5 / wall + 1.5 / roof + 0.5 / floor + 150.0 * infil + 0.05 * (height - 1.0)
+    return area, area * intensity
+
+def write_eplusout(run_dir, area_factor, energy_factor):
+    if not os.path.exists(template_path):
+        build_template()
+    os.makedirs(run_dir, exist_ok=True)
+    sql_path = os.path.join(run_dir, "eplusout.sql")
+    shutil.copyfile(template_path, sql_path)
+
+    conn = sqlite3.connect(sql_path)
+    scale = """
+        UPDATE TabularData SET Value = printf('%.2f', CAST(Value AS REAL) * ?)
+        WHERE TableNameIndex IN (SELECT StringIndex FROM Strings WHERE StringTypeIndex = 3 AND Value = ?)
+          AND ColumnNameIndex IN (SELECT StringIndex FROM Strings WHERE StringTypeIndex = 5 AND Value LIKE ?)
+    """
+    conn.execute(scale, (area_factor, "Building Area", "%"))
+    conn.execute(scale, (energy_factor, "End Uses", "%"))
+    conn.execute(scale, (energy_factor, "Site and Source Energy", "Total Energy"))
+    conn.execute(scale, (energy_factor / area_factor, "Site and Source Energy", "Energy Per%"))
+    conn.commit()
+    conn.close()
+    return sql_path
+
+def main(argv):
+    if len(argv) < 3 or argv[0] != "run" or argv[1] != "-w":
+        print("usage: fake_openstudio.py run -w <workflow.osw>", file=sys.stderr)
+        return 2
+
+    osw_path = argv[2]
+    with open(osw_path) as f:
+        osw = json.load(f)
+    area, energy = workflow_factors(osw)
+    write_eplusout(os.path.join(os.path.dirname(os.path.abspath(osw_path)), "run"), area, energy)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
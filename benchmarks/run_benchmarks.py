@@ -0,0 +1,283 @@
+"""
+Benchmarks for the sweep pipeline, without Docker or EnergyPlus.
+
+Every stage is timed on its own at each plan size:
+
+    plan_list       generate_job_list()
+    plan_mmap       write_job_plan() into plan.npy
+    dispatch_async  async_sweep.run_sweep()
+    dispatch_pool   the Pool + shared-plan driver
+    extract         collect_results() on a realistic eplusout.sql
+    sink            store_result() into results.npy + CSV export
+
+The dispatch cases start a no-op process per job by default, so they
+measure orchestration overhead alone (plan lookup, workflow write, process
+spawn, result store). `--simulator fake` runs fake_openstudio.py instead, a
+stand-in for openstudio that writes a full eplusout.sql. That measures the
+whole pipeline without Docker.
+
+Each (case, size) runs in a fresh interpreter so peak RSS is per case. Peak
+RSS is reported for the case process and, separately, for the largest child
+it waited on (Pool workers, simulator processes). On Linux a child's peak
+includes the pages it inherited from the parent before exec. For
+dispatch_async with the no-op simulator, that column therefore shows the
+parent's own size, not any simulator memory.
+
+The extract case costs about 45 ms per job (the extractor's queries scan
+the whole TabularDataWithStrings view), so by default it only runs at 1k
+and 10k jobs. Pass --sizes explicitly to include 100k (over an hour).
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --cases extract sink --sizes 1000 10000
+    python benchmarks/run_benchmarks.py --cases dispatch_async --simulator fake --sizes 1000
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import contextlib
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(bench_dir)
+
+# generate_dataset discovers weather/seeds from the working directory
+os.chdir(project_root)
+sys.path[:0] = [project_root, bench_dir]
+
+import numpy as np
+
+import generate_dataset as gd
+import fake_openstudio
+
+CASES = ["plan_list", "plan_mmap", "dispatch_async", "dispatch_pool", "extract", "sink"]
+DEFAULT_SIZES = [1000, 10000, 100000]
+CASE_DEFAULT_SIZES = {"extract": [1000, 10000]}  # ~45 ms/job, see module docstring
+
+# ==========================================
+# 1. HELPERS
+# ==========================================
+def sized_grid(n_jobs):
+    """Replaces the numeric axes of sweep_config with a grid of exactly n_jobs points"""
+    keys = list(gd.INPUT_COLUMNS)
+    lengths = [1] * len(keys)
+
+    # Spread the prime factors of n_jobs round-robin over the axes
+    factors, rest, p = [], n_jobs, 2
+    while p * p <= rest:
+        while rest % p == 0:
+            factors.append(p)
+            rest //= p
+        p += 1
+    if rest > 1:
+        factors.append(rest)
+    for n, f in enumerate(sorted(factors, reverse=True)):
+        lengths[n % len(keys)] *= f
+
+    grid = {}
+    for key, length in zip(keys, lengths):
+        lo, hi = min(gd.sweep_config[key]), max(gd.sweep_config[key])
+        grid[key] = list(np.linspace(lo, hi, length)) if length > 1 else [lo]
+    grid["weather"] = gd.weather_files[:1]
+    grid["seed"] = gd.seed_files[:1]
+    return grid
+
+def peak_rss_mb(who="RUSAGE_SELF"):
+    """Peak RSS of this process, or of its largest waited-for child (who="RUSAGE_CHILDREN")"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(getattr(resource, who)).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+def simulator_cmd_for(simulator):
+    if simulator == "fake":
+        return [sys.executable, os.path.join(bench_dir, "fake_openstudio.py")]
+    # No-op: the cheapest process the platform can start
+    noop = shutil.which("true")
+    return [noop] if noop else [sys.executable, "-c", "pass"]
+
+def fake_result_row():
+    row = {name: 0.0 for name in gd.RESULT_DTYPE.names}
+    row["valid_sim"] = True
+    return row
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def init_bench_worker(cmd, out_dir, plan_file, results_file):
+    # Pool workers may be spawned fresh, so the overrides are re-applied here
+    gd.simulator_cmd = cmd
+    gd.output_dir = out_dir
+    gd.init_worker(plan_file, results_file)
+
+# ==========================================
+# 2. CASES
+# ==========================================
+# Each case prepares its inputs, then returns the seconds spent in the
+# measured stage only.
+def bench_plan_list(n_jobs, work_dir):
+    start = time.perf_counter()
+    jobs = gd.generate_job_list()
+    elapsed = time.perf_counter() - start
+    assert len(jobs) == n_jobs
+    return elapsed
+
+def bench_plan_mmap(n_jobs, work_dir):
+    start = time.perf_counter()
+    assert gd.write_job_plan(os.path.join(work_dir, "plan.npy")) == n_jobs
+    return time.perf_counter() - start
+
+def _prepare_plan(n_jobs, work_dir):
+    plan_file = os.path.join(work_dir, "plan.npy")
+    results_file = os.path.join(work_dir, "results.npy")
+    gd.write_job_plan(plan_file)
+    gd.create_result_array(results_file, n_jobs)
+    return plan_file, results_file
+
+def _check_dispatch(results):
+    # The no-op simulator writes no eplusout.sql, so only fake runs are valid
+    if gd.simulator_cmd[-1].endswith("fake_openstudio.py"):
+        assert results["valid_sim"].all()
+
+def bench_dispatch_async(n_jobs, work_dir):
+    import asyncio
+    import async_sweep
+
+    plan_file, results_file = _prepare_plan(n_jobs, work_dir)
+    plan = np.load(plan_file, mmap_mode="r")
+    results = np.load(results_file, mmap_mode="r+")
+    async_sweep.progress_port = 0  # any free port
+
+    start = time.perf_counter()
+    with quiet():
+        asyncio.run(async_sweep.run_sweep(plan, results))
+    elapsed = time.perf_counter() - start
+    _check_dispatch(results)
+    return elapsed
+
+def bench_dispatch_pool(n_jobs, work_dir):
+    from multiprocessing import Pool
+
+    plan_file, results_file = _prepare_plan(n_jobs, work_dir)
+    initargs = (gd.simulator_cmd, gd.output_dir, plan_file, results_file)
+
+    start = time.perf_counter()
+    with Pool(gd.num_workers, initializer=init_bench_worker, initargs=initargs) as p:
+        for _ in p.imap_unordered(gd.run_plan_job, range(n_jobs)):
+            pass
+    elapsed = time.perf_counter() - start
+    _check_dispatch(np.load(results_file, mmap_mode="r"))
+    return elapsed
+
+def bench_extract(n_jobs, work_dir):
+    plan_file, _ = _prepare_plan(n_jobs, work_dir)
+    plan = np.load(plan_file, mmap_mode="r")
+    if not os.path.exists(fake_openstudio.template_path):
+        fake_openstudio.build_template()
+
+    # collect_results() deletes the run folder, so each file is staged
+    # (hard link, or copy) outside the timed section.
+    elapsed = 0.0
+    for i in range(n_jobs):
+        job = gd.job_from_plan(plan, i)
+        run_dir = os.path.join(gd.output_dir, job['run_id'], "run")
+        os.makedirs(run_dir)
+        sql_path = os.path.join(run_dir, "eplusout.sql")
+        try:
+            os.link(fake_openstudio.template_path, sql_path)
+        except OSError:
+            shutil.copyfile(fake_openstudio.template_path, sql_path)
+
+        start = time.perf_counter()
+        res = gd.collect_results(job, os.path.dirname(run_dir))
+        elapsed += time.perf_counter() - start
+        assert res["valid_sim"]
+    return elapsed
+
+def bench_sink(n_jobs, work_dir):
+    plan_file, results_file = _prepare_plan(n_jobs, work_dir)
+    plan = np.load(plan_file, mmap_mode="r")
+    results = np.load(results_file, mmap_mode="r+")
+    row = fake_result_row()
+
+    start = time.perf_counter()
+    for i in range(n_jobs):
+        gd.store_result(results, i, row)
+    df = gd.plan_to_frame(plan, results, np.flatnonzero(results["valid_sim"]))
+    df.to_csv(os.path.join(work_dir, "sweep_results.csv"), index=False)
+    return time.perf_counter() - start
+
+# ==========================================
+# 3. DRIVER
+# ==========================================
+def run_case(case, n_jobs, simulator="noop"):
+    """Runs one case in this process and returns its measurements"""
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{case}_")
+    try:
+        grid = sized_grid(n_jobs)
+        gd.sweep_config.clear()
+        gd.sweep_config.update(grid)
+        gd.output_dir = os.path.join(work_dir, "runs")
+        os.makedirs(gd.output_dir)
+        gd.simulator_cmd = simulator_cmd_for(simulator)
+
+        elapsed = globals()[f"bench_{case}"](n_jobs, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "case": case,
+        "jobs": n_jobs,
+        "seconds": round(elapsed, 4),
+        "jobs_per_s": round(n_jobs / elapsed, 1) if elapsed > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "children_peak_rss_mb": peak_rss_mb("RUSAGE_CHILDREN"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--sizes", nargs="+", type=int,
+                        help=f"default {DEFAULT_SIZES} (extract: {CASE_DEFAULT_SIZES['extract']})")
+    parser.add_argument("--simulator", choices=["noop", "fake"], default="noop",
+                        help="process started per job in the dispatch cases")
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "JOBS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(args.child[0], int(args.child[1]), args.simulator)))
+        return
+
+    # Built once up front so no fake run pays for parsing eplustbl.htm
+    fake_openstudio.build_template()
+
+    print(f"Dispatch simulator: {args.simulator}")
+    print(f"{'Case':<16} | {'Jobs':>8} | {'Seconds':>10} | {'Jobs/s':>12} | {'Peak RSS (MB)':>13} | {'Largest child incl. inherited (MB)':>34}")
+    print("-" * 109)
+    for case in args.cases:
+        for n_jobs in args.sizes or CASE_DEFAULT_SIZES.get(case, DEFAULT_SIZES):
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", case, str(n_jobs),
+                 "--simulator", args.simulator],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                print(f"{case:<16} | {n_jobs:>8} | FAILED")
+                print(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            rss, child_rss = (
+                f"{r[k]:.1f}" if r[k] is not None else "n/a"
+                for k in ("peak_rss_mb", "children_peak_rss_mb")
+            )
+            print(f"{case:<16} | {n_jobs:>8} | {r['seconds']:>10.3f} | {r['jobs_per_s']:>12} | {rss:>13} | {child_rss:>34}")
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ import time
 import itertools
 from multiprocessing import Pool
 
+import numpy as np
+
 # ==========================================
 # 0. UNIT CONVERSION HELPERS
 # ==========================================
@@ -27,9 +29,13 @@ weather_dir = os.path.join(project_root, "weather")
 seeds_dir = os.path.join(project_root, "seeds")
 num_workers = 15  # Adjust based on RAM
 
-# Auto-Discovery
-weather_files = [f for f in os.listdir(weather_dir) if f.endswith(".epw")] if os.path.exists(weather_dir) else []
-seed_files = [f for f in os.listdir(seeds_dir) if f.endswith(".osm")] if os.path.exists(seeds_dir) else []
+# Leave as None to simulate in Docker. Set to a local command (e.g. the
+# benchmarks' fake openstudio) to call `<cmd> run -w <host workflow.osw>` instead.
+simulator_cmd = None
+
+# Auto-Discovery (sorted so every worker process sees the same index order)
+weather_files = sorted(f for f in os.listdir(weather_dir) if f.endswith(".epw")) if os.path.exists(weather_dir) else []
+seed_files = sorted(f for f in os.listdir(seeds_dir) if f.endswith(".osm")) if os.path.exists(seeds_dir) else []
 
 if not weather_files or not seed_files:
     print("ERROR: Missing weather (.epw) or seed (.osm) files.")
@@ -60,6 +66,28 @@ sweep_config = {
     "seed":         seed_files              
 }
 
+# Output column for each swept input (values are saved in SI, not IP)
+INPUT_COLUMNS = {
+    "scale_x": "scale_x_factor",
+    "scale_y": "scale_y_factor",
+    "scale_z": "scale_z_factor",
+    "wwr":     "wwr_ratio",
+    "wall_r":  "wall_r_m2K_W",
+    "roof_r":  "roof_r_m2K_W",
+    "floor_r": "floor_r_m2K_W",
+    "infil":   "infil_rate_m3_s_m2",
+}
+
+END_USES = [
+    "Heating", "Cooling", "Interior Lighting", "Exterior Lighting",
+    "Interior Equipment", "Exterior Equipment", "Fans", "Pumps",
+    "Heat Rejection", "Humidification", "Heat Recovery", 
+    "Water Systems", "Refrigeration", "Generators"
+]
+
+def end_use_column(use):
+    return f"eui_{use.lower().replace(' ', '_')}_MJ_m2"
+
 # ==========================================
 # 3. JOB GENERATOR
 # ==========================================
@@ -76,15 +104,107 @@ def generate_job_list():
     return formatted_jobs
 
 # ==========================================
-# 4. WORKER FUNCTION
+# 3b. SHARED JOB PLAN (MEMORY-MAPPED)
 # ==========================================
-def run_simulation(job):
-    run_id = job['run_id']
-    run_folder = os.path.join(output_dir, run_id)
+# The plan and the results live in fixed-layout .npy files that every
+# process maps from disk, so only job indices cross the Pool's pipes.
+# Weather and seed are stored as indices into weather_files / seed_files.
+plan_path = os.path.join(output_dir, "plan.npy")
+results_path = os.path.join(output_dir, "results.npy")
+PLAN_CHUNK = 65536  # rows filled per step when writing the plan
+
+PLAN_DTYPE = np.dtype(
+    [(key, "f8") for key in INPUT_COLUMNS] +
+    [("weather", "u2"), ("seed", "u2")]
+)
+
+RESULT_DTYPE = np.dtype(
+    [("valid_sim", "?"), ("eui_total_MJ_m2", "f8"),
+     ("total_area_m2", "f8"), ("total_volume_m3", "f8")] +
+    [(end_use_column(use), "f8") for use in END_USES]
+)
+
+def write_job_plan(path):
+    """Writes the full grid to a memory-mapped plan file, in the same order as generate_job_list()"""
+    keys = list(sweep_config.keys())
+    shape = [len(v) for v in sweep_config.values()]
+    n_jobs = int(np.prod(shape))
+
+    plan = np.lib.format.open_memmap(path, mode="w+", dtype=PLAN_DTYPE, shape=(n_jobs,))
+    grids = {k: np.asarray(v, dtype="f8") for k, v in sweep_config.items() if k in INPUT_COLUMNS}
+
+    for start in range(0, n_jobs, PLAN_CHUNK):
+        stop = min(start + PLAN_CHUNK, n_jobs)
+        positions = np.unravel_index(np.arange(start, stop), shape)
+        for key, pos in zip(keys, positions):
+            plan[key][start:stop] = grids[key][pos] if key in grids else pos
+
+    plan.flush()
+    del plan
+    return n_jobs
+
+def create_result_array(path, n_jobs):
+    """Preallocates the shared result file (zero-filled, i.e. every run starts as invalid)"""
+    results = np.lib.format.open_memmap(path, mode="w+", dtype=RESULT_DTYPE, shape=(n_jobs,))
+    results.flush()
+    return results
+
+def job_from_plan(plan, i):
+    row = plan[i]
+    job = {key: float(row[key]) for key in INPUT_COLUMNS}
+    job['weather'] = weather_files[row['weather']]
+    job['seed'] = seed_files[row['seed']]
+    job['run_id'] = f"run_{i:04d}"
+    return job
+
+def plan_to_frame(plan, results, rows):
+    """Builds the export table for the given row indices of the plan/result arrays"""
+    import pandas as pd
+
+    data = {
+        "run_id": [f"run_{i:04d}" for i in rows],
+        "seed_file": np.asarray(seed_files, dtype=object)[plan["seed"][rows]],
+        "weather_file": np.asarray(weather_files, dtype=object)[plan["weather"][rows]],
+    }
+    for key, col in INPUT_COLUMNS.items():
+        data[col] = plan[key][rows]
+    for name in RESULT_DTYPE.names:
+        data[name] = results[name][rows]
+    return pd.DataFrame(data)
+
+def export_results(plan, results, n_jobs, start_time):
+    """Writes the valid runs to sweep_results_corrected.csv and prints the summary banner"""
+    valid_rows = np.flatnonzero(results["valid_sim"])
+    if not valid_rows.size:
+        print("\nFAILURE. No valid runs.")
+        return None
+
+    df = plan_to_frame(plan, results, valid_rows)
     
-    # Docker Paths
-    docker_root = project_root.replace(":\\", "/").replace("\\", "/").lower()
-    if not docker_root.startswith("/"): docker_root = "/" + docker_root
+    # Sort Columns
+    priority = ["run_id", "seed_file", "weather_file", "valid_sim", 
+                "eui_total_MJ_m2", "total_area_m2", "total_volume_m3"]
+    rest = [c for c in df.columns if c not in priority]
+    rest.sort()
+    df = df[priority + rest]
+    
+    csv_path = os.path.join(project_root, "sweep_results_corrected.csv")
+    df.to_csv(csv_path, index=False)
+    
+    print("\n" + "="*30)
+    print(f"DONE in {round(time.time() - start_time)} seconds.")
+    print(f"Valid Runs: {len(df)}/{n_jobs}")
+    print(f"Dataset: {csv_path}")
+    print("="*30)
+    return csv_path
+
+# ==========================================
+# 4. WORKER FUNCTION
+# ==========================================
+# run_simulation() is split into its three stages (workflow, simulator command,
+# result extraction) so async_sweep.py can drive the same steps.
+def write_workflow(job):
+    run_folder = os.path.join(output_dir, job['run_id'])
 
     try: os.makedirs(run_folder, exist_ok=True)
     except: pass
@@ -124,6 +244,16 @@ def run_simulation(job):
     with open(os.path.join(run_folder, "workflow.osw"), 'w') as f:
         json.dump(osw_content, f, indent=4)
 
+    return run_folder
+
+def simulator_command(run_id):
+    if simulator_cmd:
+        return list(simulator_cmd) + ["run", "-w", os.path.join(output_dir, run_id, "workflow.osw")]
+
+    # Docker Paths
+    docker_root = project_root.replace(":\\", "/").replace("\\", "/").lower()
+    if not docker_root.startswith("/"): docker_root = "/" + docker_root
+
     # --- B. RUN DOCKER ---
     container_osw = f"/work/dataset_runs_sweep/{run_id}/workflow.osw"
     cmd = [
@@ -135,8 +265,10 @@ def run_simulation(job):
         "openstudio", "run",
         "-w", container_osw
     ]
-    
-    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cmd
+
+def collect_results(job, run_folder):
+    run_id = job['run_id']
 
     # --- C. EXTRACT ALL RESULTS ---
     sql_path = os.path.join(run_folder, "run", "eplusout.sql")
@@ -146,27 +278,14 @@ def run_simulation(job):
         "run_id": run_id,
         "seed_file": job['seed'],
         "weather_file": job['weather'],
-        "scale_x_factor": job['scale_x'],
-        "scale_y_factor": job['scale_y'],
-        "scale_z_factor": job['scale_z'],
-        "wwr_ratio": job['wwr'],
         # Saving the original SI job values, not the converted IP ones!
-        "wall_r_m2K_W": job['wall_r'],
-        "roof_r_m2K_W": job['roof_r'],
-        "floor_r_m2K_W": job['floor_r'],
-        "infil_rate_m3_s_m2": job['infil'],
+        **{col: job[key] for key, col in INPUT_COLUMNS.items()},
         "valid_sim": False
     }
 
     # Default outputs
-    full_end_uses = [
-        "Heating", "Cooling", "Interior Lighting", "Exterior Lighting",
-        "Interior Equipment", "Exterior Equipment", "Fans", "Pumps",
-        "Heat Rejection", "Humidification", "Heat Recovery", 
-        "Water Systems", "Refrigeration", "Generators"
-    ]
-    for use in full_end_uses:
-        final_row[f"eui_{use.lower().replace(' ', '_')}_MJ_m2"] = 0.0
+    for use in END_USES:
+        final_row[end_use_column(use)] = 0.0
     
     final_row["eui_total_MJ_m2"] = 0.0
     final_row["total_area_m2"] = 0.0
@@ -193,8 +312,8 @@ def run_simulation(job):
                 
                 # End Uses
                 total_mj = 0.0
-                for cat in full_end_uses:
-                    col_name = f"eui_{cat.lower().replace(' ', '_')}_MJ_m2"
+                for cat in END_USES:
+                    col_name = end_use_column(cat)
                     cur.execute(f"SELECT Value FROM TabularDataWithStrings WHERE TableName='End Uses' AND RowName='{cat}'")
                     rows = cur.fetchall()
                     val_gj = sum([float(r[0]) for r in rows if r[0]])
@@ -218,51 +337,57 @@ def run_simulation(job):
 
     return final_row
 
+def run_simulation(job):
+    run_folder = write_workflow(job)
+    subprocess.run(simulator_command(job['run_id']), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return collect_results(job, run_folder)
+
+def store_result(results, i, res):
+    for name in RESULT_DTYPE.names:
+        results[name][i] = res[name]
+
+# ==========================================
+# 4b. SHARED-PLAN WORKER
+# ==========================================
+# Each Pool worker maps the plan (read-only) and results (read-write) once,
+# then only receives and returns the job index.
+_plan = None
+_results = None
+
+def init_worker(plan_file, results_file):
+    global _plan, _results
+    _plan = np.load(plan_file, mmap_mode="r")
+    _results = np.load(results_file, mmap_mode="r+")
+
+def run_plan_job(i):
+    store_result(_results, i, run_simulation(job_from_plan(_plan, i)))
+    return i
+
 # ==========================================
 # 5. EXECUTION
 # ==========================================
 if __name__ == "__main__":
-    import pandas as pd
-    
     if os.path.exists(output_dir): shutil.rmtree(output_dir)
     os.makedirs(output_dir)
 
     # 1. PLAN
-    jobs = generate_job_list()
-    print(f"Generated Grid: {len(jobs)} simulations.")
+    n_jobs = write_job_plan(plan_path)
+    plan = np.load(plan_path, mmap_mode="r")
+    results = create_result_array(results_path, n_jobs)
+    print(f"Generated Grid: {n_jobs} simulations.")
     print("="*60)
     
     # 2. RUN
     start_time = time.time()
-    valid_data = []
     
-    with Pool(num_workers) as p:
-        for i, res in enumerate(p.imap_unordered(run_simulation, jobs)):
-            if res["valid_sim"]:
-                valid_data.append(res)
-                status = f"{res['eui_total_MJ_m2']} MJ/m2"
+    with Pool(num_workers, initializer=init_worker, initargs=(plan_path, results_path)) as p:
+        for done, i in enumerate(p.imap_unordered(run_plan_job, range(n_jobs)), 1):
+            if results["valid_sim"][i]:
+                status = f"{results['eui_total_MJ_m2'][i]} MJ/m2"
             else:
                 status = "FAIL"
-            print(f"[{i+1}/{len(jobs)}] {res['run_id']} | {res['weather_file'][:8]}.. | {status}")
+            weather = weather_files[plan["weather"][i]]
+            print(f"[{done}/{n_jobs}] run_{i:04d} | {weather[:8]}.. | {status}")
 
     # 3. EXPORT
-    if valid_data:
-        df = pd.DataFrame(valid_data)
-        
-        # Sort Columns
-        priority = ["run_id", "seed_file", "weather_file", "valid_sim", 
-                    "eui_total_MJ_m2", "total_area_m2", "total_volume_m3"]
-        rest = [c for c in df.columns if c not in priority]
-        rest.sort()
-        df = df[priority + rest]
-        
-        csv_path = os.path.join(project_root, "sweep_results_corrected.csv")
-        df.to_csv(csv_path, index=False)
-        
-        print("\n" + "="*30)
-        print(f"DONE in {round(time.time() - start_time)} seconds.")
-        print(f"Valid Runs: {len(df)}/{len(jobs)}")
-        print(f"Dataset: {csv_path}")
-        print("="*30)
-    else:
-        print("\nFAILURE. No valid runs.")
\ No newline at end of file
+    export_results(plan, results, n_jobs, start_time)
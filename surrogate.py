@@ -0,0 +1,543 @@
+"""
+Surrogate EUI model trained on a harvested sweep dataset, served over HTTP.
+
+One model is fitted per (seed_file, weather_file): a bootstrap ensemble of
+ridge regressions on quadratic features of the SI inputs. A prediction is
+one matrix product per ensemble, so thousands of design vectors are
+answered per call. The spread across the ensemble (plus the residual noise)
+is reported as the uncertainty.
+
+Besides sweep_results_corrected.csv, the older harvested files
+(training_data*.csv) load too. Their columns are mapped onto the sweep
+names and their IP R-values converted to SI (see load_dataset()). Inputs
+such a file never varied are held at FEATURE_DEFAULTS, and requests may
+omit them. A file without seed/weather columns gets KEY_DEFAULTS. The
+infil_type column of training_data_parallel.csv is not used.
+
+Queries outside the trained input box, or for an unseen seed/weather, are
+still answered but flagged. When the seed and weather files exist in
+seeds/ and weather/, they are also appended to a queue of real simulations.
+`run-queue` runs that queue through run_simulation() and appends the
+results to the dataset, so the next `serve` learns from them. Failed runs
+go to surrogate_failed.jsonl; the same query queues a retry.
+
+    python surrogate.py serve [--dataset sweep_results_corrected.csv | training_data_v2.csv ...]
+    python surrogate.py run-queue
+    python surrogate.py check       # synthetic-data self-check
+
+    curl -X POST http://127.0.0.1:8766/predict -d '{
+        "seed_file": "doas_with_fan_coil_chiller_with_boiler.osm",
+        "weather_file": "CAN_AB_Calgary.Intl.AP.718770_TMYx.2009-2023.epw",
+        "inputs": {"wall_r_m2K_W": [2.5, 4.0], "wwr_ratio": [0.3, 0.45], ...}
+    }'
+"""
+import os
+import json
+import uuid
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from generate_dataset import (
+    INPUT_COLUMNS, RSI_TO_IP_FACTOR, project_root, seed_files, sweep_config, weather_files,
+)
+
+# ==========================================
+# 1. SETTINGS
+# ==========================================
+dataset_path = os.path.join(project_root, "sweep_results_corrected.csv")
+queue_path = os.path.join(project_root, "surrogate_queue.jsonl")
+failed_path = os.path.join(project_root, "surrogate_failed.jsonl")
+serve_host = "127.0.0.1"
+serve_port = 8766
+
+FEATURES = list(INPUT_COLUMNS.values())
+TARGET = "eui_total_MJ_m2"
+KEY_COLUMNS = ["seed_file", "weather_file"]
+
+n_models = 32       # bootstrap ensemble size per seed/weather
+ridge_alpha = 1e-3  # on standardized quadratic features
+ood_margin = 0.05   # fraction of each input's trained range allowed outside it
+queue_batch_cap = 50  # new simulations one /predict call may queue
+queue_decimals = 6    # rounding of inputs when matching already-queued jobs
+
+# ==========================================
+# 1b. DATASETS
+# ==========================================
+# Column names used by the earlier scripts (training_data*.csv). Their
+# R-values are IP (ft2-F-hr/Btu), as the measures received them.
+LEGACY_COLUMNS = {
+    "r_value":      "wall_r_m2K_W",   # training_data.csv only varied the wall
+    "wall_r":       "wall_r_m2K_W",
+    "roof_r":       "roof_r_m2K_W",
+    "floor_r":      "floor_r_m2K_W",
+    "wwr":          "wwr_ratio",
+    "infiltration": "infil_rate_m3_s_m2",
+    "infil_base":   "infil_rate_m3_s_m2",
+    "weather":      "weather_file",
+    "eui":          TARGET,
+}
+IP_R_COLUMNS = ["wall_r_m2K_W", "roof_r_m2K_W", "floor_r_m2K_W"]
+
+# Inputs a dataset did not vary: geometry was never scaled, everything
+# else is taken at the first value of the sweep grid.
+FEATURE_DEFAULTS = {
+    col: 1.0 if key.startswith("scale_") else float(sweep_config[key][0])
+    for key, col in INPUT_COLUMNS.items()
+}
+# training_data.csv came from generate_and_run.py: a DOE prototype on weather.epw
+KEY_DEFAULTS = {"seed_file": "CreateDOEPrototypeBuilding", "weather_file": "weather.epw"}
+
+def load_dataset(path):
+    """Reads a harvested CSV in the sweep or a legacy schema.
+
+    Returns (frame, defaulted) where defaulted lists the FEATURES that were
+    filled from FEATURE_DEFAULTS because the file does not have them.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    if TARGET not in df.columns:
+        df = df.rename(columns={c: LEGACY_COLUMNS[c] for c in df.columns if c in LEGACY_COLUMNS})
+        for col in IP_R_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col] / RSI_TO_IP_FACTOR
+
+    present = [col for col in FEATURES if col in df.columns]
+    if TARGET not in df.columns or not present:
+        raise SystemExit(
+            f"ERROR: {path} has no '{TARGET}' (or legacy 'eui') column or no known input "
+            f"columns. Found: {', '.join(map(str, df.columns))}"
+        )
+
+    defaulted = [col for col in FEATURES if col not in present]
+    for col in defaulted:
+        df[col] = FEATURE_DEFAULTS[col]
+    for col, default in KEY_DEFAULTS.items():
+        if col not in df.columns:
+            df[col] = default
+    return df, defaulted
+
+# ==========================================
+# 2. MODEL
+# ==========================================
+def quadratic_features(z):
+    """[1, z_i, z_i*z_j (i <= j)] for an (N, d) block of standardized inputs"""
+    n, d = z.shape
+    i, j = np.triu_indices(d)
+    return np.hstack([np.ones((n, 1)), z, z[:, i] * z[:, j]])
+
+class GroupModel:
+    """Bootstrap ridge ensemble for one seed/weather combination"""
+
+    def __init__(self, X, y, rng):
+        self.n_rows = len(y)
+        self.lo, self.hi = X.min(axis=0), X.max(axis=0)
+        self.mean = X.mean(axis=0)
+        self.scale = X.std(axis=0)
+        self.scale[self.scale == 0] = 1.0  # inputs held fixed in the sweep
+
+        phi = quadratic_features((X - self.mean) / self.scale)
+        penalty = ridge_alpha * np.eye(phi.shape[1])
+        penalty[0, 0] = 0.0  # never shrink the intercept
+
+        weights = []
+        for _ in range(n_models):
+            rows = rng.integers(0, self.n_rows, self.n_rows)
+            a, b = phi[rows], y[rows]
+            weights.append(np.linalg.solve(a.T @ a + penalty, a.T @ b))
+        self.weights = np.stack(weights, axis=1)  # (features, n_models)
+
+        residuals = phi @ self.weights.mean(axis=1) - y
+        self.noise_var = float(residuals @ residuals) / max(self.n_rows - 1, 1)
+
+    def in_distribution(self, X):
+        slack = ood_margin * (self.hi - self.lo)
+        return np.all((X >= self.lo - slack) & (X <= self.hi + slack), axis=1)
+
+    def predict(self, X):
+        ensemble = quadratic_features((X - self.mean) / self.scale) @ self.weights
+        std = np.sqrt(ensemble.var(axis=1) + self.noise_var)
+        return ensemble.mean(axis=1), std
+
+class Surrogate:
+    """One GroupModel per key (seed_file, weather_file) of the harvested dataset"""
+
+    def __init__(self, features=FEATURES, target=TARGET, key_columns=KEY_COLUMNS):
+        self.features = list(features)
+        self.target = target
+        self.key_columns = list(key_columns)
+        self.groups = {}
+        self.defaulted = []  # features held at FEATURE_DEFAULTS (may be omitted in requests)
+
+    def fit(self, df, seed=0, defaulted=()):
+        self.defaulted = list(defaulted)
+        if "valid_sim" in df.columns:
+            df = df[df["valid_sim"].astype(bool)]
+        rng = np.random.default_rng(seed)
+        self.groups = {}
+        for key, group in df.groupby(self.key_columns):
+            key = key if isinstance(key, tuple) else (key,)
+            X = group[self.features].to_numpy(dtype="f8")
+            y = group[self.target].to_numpy(dtype="f8")
+            self.groups[tuple(str(k) for k in key)] = GroupModel(X, y, rng)
+        return self
+
+    def predict(self, key, X):
+        """Returns (mean, std, in_distribution) arrays for an (N, features) block"""
+        X = np.asarray(X, dtype="f8").reshape(-1, len(self.features))
+        model = self.groups.get(tuple(str(k) for k in key))
+        if model is None:
+            nan = np.full(len(X), np.nan)
+            return nan, nan.copy(), np.zeros(len(X), dtype=bool)
+        mean, std = model.predict(X)
+        return mean, std, model.in_distribution(X)
+
+    def summary(self):
+        return {
+            "target": self.target,
+            "features": self.features,
+            "key_columns": self.key_columns,
+            "defaulted": {col: FEATURE_DEFAULTS[col] for col in self.defaulted},
+            "groups": [
+                {**dict(zip(self.key_columns, key)), "rows": m.n_rows}
+                for key, m in self.groups.items()
+            ],
+        }
+
+# ==========================================
+# 3. OUT-OF-DISTRIBUTION QUEUE
+# ==========================================
+class SimulationQueue:
+    """Appends jobs (generate_job_list() format) for queries the surrogate cannot cover
+
+    A job is only queued once per (seed, weather, rounded inputs): repeats
+    return the run_id of the pending job. Each call queues at most
+    queue_batch_cap new jobs, so one large out-of-range batch cannot turn
+    into thousands of simulations.
+    """
+
+    def __init__(self, path=queue_path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = {}  # dedup key -> run_id
+        self._seen = None
+        self._sync()
+
+    def _sync(self):
+        """Rebuilds pending from the queue files whenever they change on disk
+
+        Jobs being simulated by run-queue (.running) are still pending; once
+        run-queue removes that file they drop out, so the same query can be
+        queued again if its run failed.
+        """
+        seen = self._stat()
+        if seen == self._seen:
+            return
+        self.pending = {}
+        for p in (self.path + ".running", self.path):
+            if os.path.exists(p):
+                with open(p) as f:
+                    for line in f:
+                        if line.strip():
+                            job = json.loads(line)
+                            self.pending[self._key(job)] = job['run_id']
+        self._seen = seen
+
+    def _stat(self):
+        return tuple(
+            (os.stat(p).st_mtime_ns, os.stat(p).st_size) if os.path.exists(p) else None
+            for p in (self.path + ".running", self.path)
+        )
+
+    @staticmethod
+    def _key(job):
+        inputs = tuple(round(float(job[k]), queue_decimals) for k in INPUT_COLUMNS)
+        return (job['seed'], job['weather'], inputs)
+
+    def add(self, seed_file, weather_file, X, features):
+        """Returns one run_id per row of X (None for rows over the batch cap)"""
+        key_of = {col: key for key, col in INPUT_COLUMNS.items()}
+        run_ids = []
+        added = 0
+        with self.lock:
+            self._sync()
+            with open(self.path, "a") as f:
+                for row in np.atleast_2d(X):
+                    job = {key_of[col]: float(v) for col, v in zip(features, row)}
+                    job['seed'] = seed_file
+                    job['weather'] = weather_file
+                    key = self._key(job)
+                    if key not in self.pending:
+                        if added >= queue_batch_cap:
+                            run_ids.append(None)
+                            continue
+                        # Unique across server restarts, so run_ids never repeat in the dataset
+                        job['run_id'] = f"query_{uuid.uuid4().hex[:12]}"
+                        f.write(json.dumps(job) + "\n")
+                        self.pending[key] = job['run_id']
+                        added += 1
+                    run_ids.append(self.pending[key])
+            # Our own appends are already in pending; no need to re-read them
+            self._seen = self._stat()
+        return run_ids
+
+def run_queue(path=queue_path, dataset=dataset_path, failed=failed_path):
+    """Simulates every queued job, appends the valid rows to the dataset and logs the failures"""
+    import pandas as pd
+    from multiprocessing import Pool
+    from generate_dataset import num_workers, run_simulation
+
+    # Take the queue away from the server first: its next append starts a
+    # fresh file. A leftover .running file is from an interrupted run, so it
+    # is resumed instead.
+    running = path + ".running"
+    if not os.path.exists(running):
+        if not os.path.exists(path):
+            print("Queue is empty.")
+            return
+        os.replace(path, running)
+    with open(running, "rb") as f:
+        consumed = f.read()
+    jobs = [json.loads(line) for line in consumed.decode().splitlines() if line.strip()]
+
+    print(f"Simulating {len(jobs)} queued queries...")
+    with Pool(num_workers) as p:
+        rows = [r for r in p.imap_unordered(run_simulation, jobs) if r["valid_sim"]]
+
+    valid_ids = {r["run_id"] for r in rows}
+    failed_jobs = [job for job in jobs if job['run_id'] not in valid_ids]
+    if failed_jobs:
+        with open(failed, "a") as f:
+            for job in failed_jobs:
+                f.write(json.dumps(job) + "\n")
+
+    if rows:
+        new = pd.DataFrame(rows)
+        if os.path.exists(dataset):
+            new = pd.concat([pd.read_csv(dataset), new], ignore_index=True)
+        new.to_csv(dataset, index=False)
+
+    # An append that was already open during the rename lands in the
+    # .running file after our read; hand those lines back to the queue.
+    with open(running, "rb") as f:
+        f.seek(len(consumed))
+        late = f.read()
+    if late:
+        with open(path, "ab") as f:
+            f.write(late)
+    os.remove(running)
+    print(f"Valid Runs: {len(rows)}/{len(jobs)} appended to {dataset}")
+    if failed_jobs:
+        print(f"Failed Runs: {len(failed_jobs)} logged to {failed}")
+
+# ==========================================
+# 4. HTTP SERVICE
+# ==========================================
+def answer(model, queue, request):
+    """Handles one /predict body: key columns plus columnar `inputs`"""
+    key = [request[col] for col in model.key_columns]
+    inputs = request["inputs"]
+    given = {col: np.atleast_1d(np.asarray(inputs[col], dtype="f8"))
+             for col in model.features if col in inputs or col not in model.defaulted}
+    n_rows = len(next(iter(given.values()))) if given else 1
+    X = np.column_stack([
+        given[col] if col in given else np.full(n_rows, FEATURE_DEFAULTS[col])
+        for col in model.features
+    ])
+    if not np.isfinite(X).all():
+        raise ValueError("inputs must be finite numbers")
+
+    mean, std, ok = model.predict(key, X)
+    # Per row: run_id of the pending simulation for out-of-distribution rows.
+    # Only seeds/weather files that exist on disk can actually be simulated.
+    queued = [None] * len(X)
+    simulable = (
+        model.key_columns == KEY_COLUMNS and model.features == FEATURES
+        and key[0] in seed_files and key[1] in weather_files
+    )
+    if (~ok).any() and simulable:
+        for i, run_id in zip(np.flatnonzero(~ok), queue.add(*key, X[~ok], model.features)):
+            queued[i] = run_id
+
+    return {
+        "mean": np.where(np.isnan(mean), None, np.round(mean, 3)).tolist(),
+        "std": np.where(np.isnan(std), None, np.round(std, 3)).tolist(),
+        "in_distribution": ok.tolist(),
+        "queued": queued,
+    }
+
+def make_handler(model, queue):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._send(200, model.summary())
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/predict":
+                self._send(404, {"error": "POST /predict"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                self._send(200, answer(model, queue, request))
+            except (KeyError, ValueError, TypeError) as e:
+                self._send(400, {"error": f"{type(e).__name__}: {e}"})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+# ==========================================
+# 5. SELF-CHECK
+# ==========================================
+def self_check():
+    """Fits on a synthetic frame and exercises loading, predict, the queue and the HTTP paths"""
+    import tempfile
+    import urllib.request
+    import urllib.error
+    import pandas as pd
+
+    rng = np.random.default_rng(1)
+    n = 400
+    X = rng.uniform(1.0, 5.0, (n, len(FEATURES)))
+    y = 300.0 + 20.0 * X[:, 0] - 3.0 * X[:, 1] ** 2 + X[:, 2] * X[:, 3]
+    df = pd.DataFrame(X, columns=FEATURES)
+    df[TARGET] = y
+    # Real seed/weather names: only those are ever queued for simulation
+    key = (seed_files[0], weather_files[0])
+    df["seed_file"], df["weather_file"], df["valid_sim"] = *key, True
+
+    model = Surrogate().fit(df)
+
+    # Shapes, accuracy on a smooth target, in-distribution flag
+    mean, std, ok = model.predict(key, X)
+    assert mean.shape == std.shape == ok.shape == (n,)
+    assert ok.all() and (std > 0).all()
+    assert np.abs(mean - y).max() < 1.0
+
+    # A single row is accepted; the OOD box honours ood_margin
+    edge = X.max(axis=0) + 0.01 * (X.max(axis=0) - X.min(axis=0))
+    far = X.max(axis=0) * 3.0
+    _, _, ok = model.predict(key, np.vstack([edge, far]))
+    assert ok.tolist() == [True, False]
+
+    # Unseen key: NaN internally, None over JSON, nothing in distribution
+    mean, std, ok = model.predict((key[0], "other.epw"), X[:3])
+    assert np.isnan(mean).all() and np.isnan(std).all() and not ok.any()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SimulationQueue(os.path.join(tmp, "queue.jsonl"))
+        columns = lambda rows: {c: rows[:, i].tolist() for i, c in enumerate(FEATURES)}
+        base = {"seed_file": key[0], "weather_file": key[1]}
+
+        # Repeated OOD rows map to one pending job, in-distribution rows to None
+        request = {**base, "inputs": columns(np.vstack([X[0], far, far]))}
+        first = answer(model, queue, request)
+        second = answer(model, queue, request)
+        assert first["queued"][0] is None and first["queued"][1] == first["queued"][2]
+        assert second["queued"] == first["queued"]
+        # Keys with no file on disk are answered (None) but never queued
+        unknown = answer(model, queue, {**base, "weather_file": "other.epw", "inputs": columns(X[:1])})
+        assert unknown["mean"] == [None] and unknown["queued"] == [None]
+
+        # One large OOD batch queues at most queue_batch_cap jobs
+        big = far + rng.uniform(0.0, 1.0, (queue_batch_cap + 10, len(FEATURES)))
+        queued = answer(model, queue, {**base, "inputs": columns(big)})["queued"]
+        assert sum(q is not None for q in queued) == queue_batch_cap
+        with open(queue.path) as f:
+            assert sum(1 for _ in f) == queue_batch_cap + 1  # +1 far row
+
+        # A restarted server still knows what is pending
+        assert SimulationQueue(queue.path).pending == queue.pending
+
+        # Once run-queue has taken and finished the file, those jobs are no
+        # longer pending, so the same query is queued again
+        os.replace(queue.path, queue.path + ".running")
+        assert answer(model, queue, request)["queued"] == first["queued"]
+        os.remove(queue.path + ".running")
+        retry = answer(model, queue, request)["queued"]
+        assert retry[1] is not None and retry[1] != first["queued"][1]
+
+        # HTTP: 200, 400 for malformed bodies, 404 for other paths
+        server = ThreadingHTTPServer((serve_host, 0), make_handler(model, queue))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://{serve_host}:{server.server_address[1]}"
+
+        def post(path, body):
+            req = urllib.request.Request(url + path, data=body, method="POST")
+            try:
+                with urllib.request.urlopen(req) as r:
+                    return r.status
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        try:
+            assert post("/predict", json.dumps({**base, "inputs": columns(X[:2])}).encode()) == 200
+            assert post("/predict", b"not json") == 400
+            assert post("/predict", json.dumps(base).encode()) == 400                       # no inputs
+            assert post("/predict", json.dumps({"inputs": columns(X[:2])}).encode()) == 400 # no key
+            ragged = columns(X[:2])
+            ragged[FEATURES[0]] = [1.0]
+            assert post("/predict", json.dumps({**base, "inputs": ragged}).encode()) == 400
+            nan = json.dumps({**base, "inputs": columns(X[:2])}).replace(str(X[0, 0]), "NaN", 1)
+            assert "NaN" in nan and post("/predict", nan.encode()) == 400
+            assert post("/other", b"{}") == 404
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    # Legacy harvest: IP R-values converted, missing inputs and keys defaulted
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "training_data.csv")
+        r_ip = rng.uniform(10.0, 50.0, n)
+        pd.DataFrame({"run_id": range(n), "r_value": r_ip, "wwr": rng.uniform(0.1, 0.6, n),
+                      "eui": 400.0 + 500.0 / r_ip}).to_csv(legacy, index=False)
+        df, defaulted = load_dataset(legacy)
+        assert np.allclose(df["wall_r_m2K_W"], r_ip / RSI_TO_IP_FACTOR)
+        assert set(defaulted) == set(FEATURES) - {"wall_r_m2K_W", "wwr_ratio"}
+        model = Surrogate().fit(df, defaulted=defaulted)
+        out = answer(model, SimulationQueue(os.path.join(tmp, "queue.jsonl")), {
+            **KEY_DEFAULTS, "inputs": {"wall_r_m2K_W": [4.0], "wwr_ratio": [0.3]},
+        })
+        assert out["in_distribution"] == [True] and out["mean"][0] is not None
+
+        bad = os.path.join(tmp, "bad.csv")
+        pd.DataFrame({"a": [1.0], "b": [2.0]}).to_csv(bad, index=False)
+        try:
+            load_dataset(bad)
+            raise AssertionError("load_dataset accepted a file with no target")
+        except SystemExit:
+            pass
+
+    print("Surrogate self-check passed.")
+
+# ==========================================
+# 6. EXECUTION
+# ==========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["serve", "run-queue", "check"])
+    parser.add_argument("--dataset", default=dataset_path)
+    args = parser.parse_args()
+
+    if args.command == "check":
+        self_check()
+    elif args.command == "run-queue":
+        run_queue(dataset=args.dataset)
+    else:
+        df, defaulted = load_dataset(args.dataset)
+        model = Surrogate().fit(df, defaulted=defaulted)
+        print(f"Trained {len(model.groups)} seed/weather models on {args.dataset}")
+        server = ThreadingHTTPServer((serve_host, serve_port), make_handler(model, SimulationQueue()))
+        print(f"Serving: http://{serve_host}:{serve_port}/predict")
+        server.serve_forever()